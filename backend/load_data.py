@@ -1,8 +1,12 @@
 # backend/load_data.py
-import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 from pymongo import MongoClient
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
-import json # To pretty-print JSON for debugging
+import csv
+import orjson # To pretty-print JSON for debugging
 
 # --- Configuration ---
 # MongoDB connection details
@@ -24,78 +28,273 @@ CSV_COLLECTION_MAP = {
     "users.csv": "users",
 }
 
+# Extra columns computed while loading, per CSV file, as
+# {new_column: (source_column, pyarrow.compute function)}.
+# 'name_lower' lets main.py look products up by exact name through an index.
+DERIVED_COLUMNS = {
+    "products.csv": {"name_lower": ("name", pc.utf8_lower)},
+}
+
+# Set VERBOSE_INGEST (to any non-empty value) to print a sample document for each loaded file.
+VERBOSE_INGEST = bool(os.getenv("VERBOSE_INGEST"))
+
+# Indexes created after the data is loaded, per collection, as (keys, options) pairs.
+# They back the lookups done by the chatbot backend in main.py.
+COLLECTION_INDEXES = {
+    "orders": [
+        ([("order_id", 1)], {}),
+    ],
+    "products": [
+        ([("name_lower", 1)], {}),
+        ([("name", "text")], {}),
+    ],
+    "inventory_items": [
+        # Partial index over unsold items only (a null 'sold_at'); main.py counts stock with
+        # exactly this filter. Unsold items are still most of the collection (about 63% of
+        # the sample data), so this is not a tiny index. Compared to a (product_id, sold_at)
+        # index it leaves out the sold items and the sold_at values, and the stock count is
+        # an index-only scan of one product's entries.
+        ([("product_id", 1)], {"partialFilterExpression": {"sold_at": {"$type": "null"}}}),
+    ],
+    "order_items": [
+        ([("product_id", 1)], {}),
+    ],
+}
+# The conversations collection belongs to the API; its indexes are created by main.py at startup.
+
+# The "top 5 most sold products" answer only changes when the data is reloaded,
+# so it is computed once here and stored in its own collection for main.py to read.
+TOP_SOLD_PRODUCTS_COLLECTION = "top_sold_products_cache"
+TOP_SOLD_PRODUCTS_PIPELINE = [
+    {"$group": {"_id": "$product_id", "sold_count": {"$sum": 1}}},
+    {"$sort": {"sold_count": -1}},
+    {"$limit": 5},
+    {"$lookup": {
+        "from": "products",
+        "localField": "_id",
+        "foreignField": "id",
+        "as": "product_info"
+    }},
+    {"$unwind": "$product_info"},
+    {"$project": {"_id": 0, "product_name": "$product_info.name", "sold_count": 1, "category": "$product_info.category"}}
+]
+
+# CSV files are streamed in blocks of this many bytes, so peak memory per file
+# is bounded by the block size rather than by the size of the whole file.
+CSV_BLOCK_SIZE = 32 * 1024 * 1024
+
+# Maximum number of rows converted to Python dictionaries at a time.
+# A 32 MiB block can hold a few hundred thousand rows, and the dict form of a row
+# is far larger than its Arrow form, so each block is inserted in slices of this size.
+CSV_CHUNK_ROWS = 100_000
+
+# Records are written with insert_many in batches of this many documents,
+# several batches at a time on a thread pool that shares one MongoClient
+# (MongoClient is thread-safe and pools its connections).
+INSERT_BATCH_SIZE = 1000
+INSERT_WORKERS = 8
+MONGO_MAX_POOL_SIZE = 64
+
+# --- Helper Functions ---
+def csv_convert_options(file_path):
+    """
+    Builds the pyarrow conversion options for a CSV file.
+    Timestamp columns (named '*_at' in this dataset) are kept as strings, the same
+    way pandas stored them, and empty cells become nulls instead of empty strings.
+    """
+    with open(file_path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), [])
+    return pacsv.ConvertOptions(
+        column_types={name: pa.string() for name in header if name.endswith('_at')},
+        strings_can_be_null=True,
+    )
+
+def batch_to_records(batch):
+    """
+    Converts a pyarrow RecordBatch into a list of MongoDB-ready dictionaries.
+    Each column is converted to a Python list once, then the rows are zipped
+    back together, which avoids a per-cell lookup for every row.
+    """
+    columns = batch.to_pydict()
+    column_names = list(columns)
+    return [dict(zip(column_names, row)) for row in zip(*columns.values())]
+
+def add_derived_columns(batch, derived_columns):
+    """
+    Returns a copy of the RecordBatch with the given derived columns appended.
+    The columns are computed with vectorized pyarrow.compute functions.
+    """
+    names = batch.schema.names
+    arrays = batch.columns
+    for column_name, (source_column, compute_function) in derived_columns.items():
+        names.append(column_name)
+        arrays.append(compute_function(batch.column(source_column)))
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+def insert_records(collection, records, executor):
+    """
+    Inserts records into a collection in batches of INSERT_BATCH_SIZE, submitting
+    the batches to the given executor so they are written concurrently.
+    Returns the number of documents inserted.
+    """
+    futures = [
+        executor.submit(
+            collection.insert_many,
+            records[i:i + INSERT_BATCH_SIZE],
+            ordered=False, # A bad document doesn't abort the rest of the batch
+            bypass_document_validation=True,
+        )
+        for i in range(0, len(records), INSERT_BATCH_SIZE)
+    ]
+    return sum(len(future.result().inserted_ids) for future in futures)
+
+def create_indexes(db):
+    """
+    Creates the indexes listed in COLLECTION_INDEXES.
+    create_index is a no-op when an identical index already exists, so this is safe to re-run.
+    """
+    for collection_name, indexes in COLLECTION_INDEXES.items():
+        for keys, options in indexes:
+            try:
+                index_name = db[collection_name].create_index(keys, **options)
+                print(f"Ensured index '{index_name}' on '{collection_name}'.")
+            except Exception as e:
+                print(f"Error: Could not create index {keys} on '{collection_name}': {e}")
+
+def materialize_top_sold_products(db):
+    """
+    Runs the top-sold-products aggregation over order_items and writes the result
+    to TOP_SOLD_PRODUCTS_COLLECTION with $out, replacing any previous contents.
+    """
+    try:
+        db.order_items.aggregate(TOP_SOLD_PRODUCTS_PIPELINE + [{"$out": TOP_SOLD_PRODUCTS_COLLECTION}])
+        count = db[TOP_SOLD_PRODUCTS_COLLECTION].count_documents({})
+        print(f"Materialized {count} top sold products into '{TOP_SOLD_PRODUCTS_COLLECTION}'.")
+    except Exception as e:
+        print(f"Error: Could not materialize top sold products: {e}")
+
+# --- Per-File Ingestion ---
+def load_csv_file(db, csv_file, collection_name, insert_executor):
+    """
+    Reads a single CSV file from the DATA_DIR and inserts its data into the
+    corresponding MongoDB collection, clearing the collection first.
+    Returns the number of documents inserted, or None if the file could not be loaded.
+    """
+    file_path = os.path.join(DATA_DIR, csv_file)
+
+    # Check if the CSV file exists
+    if not os.path.exists(file_path):
+        print(f"Warning: CSV file '{csv_file}' not found at '{file_path}'. Skipping this file.")
+        return None
+
+    print(f"--- Processing '{csv_file}' into collection '{collection_name}' ---")
+    try:
+        # Open a streaming reader over the CSV file.
+        # pyarrow parses the file block by block (multithreaded) into typed
+        # record batches, so the whole file is never held in memory at once.
+        reader = pacsv.open_csv(
+            file_path,
+            read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE, use_threads=True),
+            convert_options=csv_convert_options(file_path),
+        )
+
+        # Access the target collection
+        collection = db[collection_name]
+
+        # Optional: Clear existing data in the collection
+        # This ensures that each run of the script results in a fresh dataset
+        # without duplicate entries from previous runs.
+        delete_result = collection.delete_many({})
+        print(f"Cleared {delete_result.deleted_count} existing documents from '{collection_name}'.")
+
+        # Insert each record batch as soon as it is parsed, one chunk of rows at a time.
+        # Each row of the batch becomes a document in MongoDB.
+        derived_columns = DERIVED_COLUMNS.get(csv_file)
+        inserted_count = 0
+        sample_doc = None
+        for batch in reader:
+            if derived_columns:
+                batch = add_derived_columns(batch, derived_columns)
+            for offset in range(0, batch.num_rows, CSV_CHUNK_ROWS):
+                chunk = batch.slice(offset, CSV_CHUNK_ROWS) # Zero-copy view
+                records = batch_to_records(chunk)
+                if sample_doc is None and records:
+                    sample_doc = records[0] # Keep the first record to print as a sample
+                inserted_count += insert_records(collection, records, insert_executor)
+
+        if inserted_count > 0:
+            print(f"Successfully inserted {inserted_count} documents into '{collection_name}'.")
+
+            # Optional: Print the first inserted document for verification.
+            # It is the record already in memory (insert_many has added its _id),
+            # so no extra round trip to MongoDB is needed.
+            if VERBOSE_INGEST:
+                # default=str converts the ObjectId _id to a string for printing.
+                # A single print call keeps the sample together while other files are loading.
+                print(f"Sample document from '{collection_name}':\n{orjson.dumps(sample_doc, default=str, option=orjson.OPT_INDENT_2).decode()}")
+        else:
+            print(f"No records found in '{csv_file}' to insert. Collection '{collection_name}' remains empty.")
+        return inserted_count
+
+    except pa.ArrowInvalid as e:
+        print(f"Error: '{csv_file}' is empty or could not be parsed ({e}). No data to load for collection '{collection_name}'.")
+    except FileNotFoundError:
+        print(f"Error: '{csv_file}' not found at '{file_path}'. Please ensure it exists.")
+    except Exception as e:
+        print(f"An error occurred while loading '{csv_file}' into '{collection_name}': {e}")
+    return None
+
 # --- Main Ingestion Function ---
 def load_csv_to_mongodb():
     """
     Connects to MongoDB, reads each specified CSV file from the DATA_DIR,
     and inserts its data into the corresponding MongoDB collection.
     It clears the collection before insertion to ensure a fresh load.
+    Files are loaded concurrently, one worker thread per file, so small files
+    don't wait behind large ones.
     """
     client = None # Initialize client to None
+    insert_executor = ThreadPoolExecutor(max_workers=INSERT_WORKERS)
     try:
         # Establish a connection to MongoDB
-        client = MongoClient(MONGO_URI)
+        client = MongoClient(MONGO_URI, maxPoolSize=MONGO_MAX_POOL_SIZE)
         db = client[DB_NAME] # Access the specified database
 
         # Ping the database to confirm connection
         client.admin.command('ping')
         print(f"Successfully connected to MongoDB server at {MONGO_URI} and accessing database '{DB_NAME}'.")
 
-        # Iterate through each CSV file and its target collection
+        # Load every CSV file into its target collection in parallel
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(CSV_COLLECTION_MAP)) as file_executor:
+            futures = {
+                file_executor.submit(load_csv_file, db, csv_file, collection_name, insert_executor): csv_file
+                for csv_file, collection_name in CSV_COLLECTION_MAP.items()
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+
+        # Summarize the outcome for every file, in the order of CSV_COLLECTION_MAP
+        print("\n--- Ingestion summary ---")
         for csv_file, collection_name in CSV_COLLECTION_MAP.items():
-            file_path = os.path.join(DATA_DIR, csv_file)
+            inserted_count = results.get(csv_file)
+            if inserted_count is None:
+                print(f"{csv_file} -> {collection_name}: not loaded")
+            else:
+                print(f"{csv_file} -> {collection_name}: {inserted_count} documents")
 
-            # Check if the CSV file exists
-            if not os.path.exists(file_path):
-                print(f"Warning: CSV file '{csv_file}' not found at '{file_path}'. Skipping this file.")
-                continue
+        # Index the loaded collections so the chatbot's lookups don't scan them
+        print("\n--- Creating indexes ---")
+        create_indexes(db)
 
-            print(f"\n--- Processing '{csv_file}' into collection '{collection_name}' ---")
-            try:
-                # Read CSV into a pandas DataFrame
-                # pandas is great for handling various CSV quirks automatically
-                df = pd.read_csv(file_path)
-
-                # Convert DataFrame to a list of dictionaries.
-                # Each dictionary will be a document in MongoDB.
-                records = df.to_dict(orient='records')
-
-                # Access the target collection
-                collection = db[collection_name]
-
-                # Optional: Clear existing data in the collection
-                # This ensures that each run of the script results in a fresh dataset
-                # without duplicate entries from previous runs.
-                delete_result = collection.delete_many({})
-                print(f"Cleared {delete_result.deleted_count} existing documents from '{collection_name}'.")
-
-                # Insert the records into the collection
-                if records:
-                    insert_result = collection.insert_many(records)
-                    print(f"Successfully inserted {len(insert_result.inserted_ids)} documents into '{collection_name}'.")
-
-                    # Optional: Print the first inserted document for verification
-                    if len(records) > 0:
-                        print("Sample document from collection:")
-                        # Retrieve and print one document to show successful ingestion
-                        sample_doc = collection.find_one({})
-                        # Remove MongoDB's internal _id for cleaner printing if desired
-                        if sample_doc and '_id' in sample_doc:
-                            sample_doc['_id'] = str(sample_doc['_id']) # Convert ObjectId to string for printing
-                        print(json.dumps(sample_doc, indent=2))
-                else:
-                    print(f"No records found in '{csv_file}' to insert. Collection '{collection_name}' remains empty.")
-
-            except pd.errors.EmptyDataError:
-                print(f"Error: '{csv_file}' is empty. No data to load for collection '{collection_name}'.")
-            except FileNotFoundError:
-                print(f"Error: '{csv_file}' not found at '{file_path}'. Please ensure it exists.")
-            except Exception as e:
-                print(f"An error occurred while loading '{csv_file}' into '{collection_name}': {e}")
+        # Precompute answers that only change when the data is reloaded
+        print("\n--- Precomputing query results ---")
+        materialize_top_sold_products(db)
 
     except Exception as e:
         print(f"Could not connect to MongoDB or a fatal error occurred: {e}")
     finally:
+        insert_executor.shutdown()
         # Ensure the MongoDB client connection is closed
         if client:
             client.close()
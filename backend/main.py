@@ -1,13 +1,24 @@
 # backend/main.py
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import ConnectionFailure, DuplicateKeyError
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Optional
+from collections import OrderedDict
+from cachetools import TTLCache
+import asyncio
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+import re
 import uuid
+import string
 import os
-import json # For debugging/pretty-printing JSON
+import orjson # Fast JSON parsing/serialization (also used for API responses)
 
 # LLM Integration imports
 import google.generativeai as genai
@@ -16,38 +27,139 @@ from dotenv import load_dotenv
 # --- NEW IMPORT FOR CORS ---
 from fastapi.middleware.cors import CORSMiddleware
 
-# Load environment variables from .env file (if it exists)
-load_dotenv()
+# --- Logging ---
+# Handlers only put log records on a queue; a background thread (the QueueListener, started
+# in the startup hook) formats them and writes them to stderr, so request handlers never
+# block on console I/O. The level comes from LOG_LEVEL (default INFO); WARNING is a good
+# production setting and DEBUG shows the full LLM exchange.
+logger = logging.getLogger("ecommerce_chatbot")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_log_queue = queue.SimpleQueue()
+logger.addHandler(QueueHandler(_log_queue))
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+_log_listener = QueueListener(_log_queue, _log_stream_handler)
 
 # --- MongoDB Configuration ---
 MONGO_URI = "mongodb://localhost:27017/"
 DB_NAME = "ecommerce_chatbot_db"
 
-# --- Initialize MongoDB client ---
+# Connection pool settings (per worker process; e.g. 4 uvicorn workers keep 4x MIN_POOL_SIZE warm connections).
+# MIN_POOL_SIZE connections are opened in the background after startup, so the first
+# requests don't pay the connection handshake. Requests wait at most WAIT_QUEUE_TIMEOUT_MS
+# for a free connection and SERVER_SELECTION_TIMEOUT_MS for a reachable server, instead
+# of piling up behind an overloaded or unavailable MongoDB.
+MONGO_MAX_POOL_SIZE = 50
+MONGO_MIN_POOL_SIZE = 10
+MONGO_WAIT_QUEUE_TIMEOUT_MS = 2000
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 3000
+
+# --- MongoDB client ---
+# Motor's AsyncIOMotorClient doesn't block the event loop while waiting on MongoDB,
+# so concurrent requests overlap their database round trips.
+# One client (and connection pool) is shared by all requests of a worker process.
+# It is created in the startup hook; `db` stays None until the connection test succeeds.
+client = None
 db = None
-try:
-    client = MongoClient(MONGO_URI)
-    db = client[DB_NAME]
-    client.admin.command('ping') # Test connection
-    print("Successfully connected to MongoDB!")
-except Exception as e:
-    print(f"ERROR: Could not connect to MongoDB. Please ensure MongoDB server is running on {MONGO_URI}: {e}")
-    # In a real application, you might exit here or implement a retry mechanism.
 
-# --- Gemini API Configuration ---
-# The API key for Gemini. For this Canvas environment, leaving it empty
-# allows the system to inject it. In a real setup, load from .env.
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+# --- Top Sold Products Cache ---
+# load_data.py materializes the top 5 most sold products into this collection.
+# Each process additionally keeps the result in memory for a short while, so bursts of
+# identical questions share one database read. The lock lets only one request refresh an
+# expired entry; the others wait for it and reuse its result.
+TOP_SOLD_PRODUCTS_COLLECTION = "top_sold_products_cache"
+TOP_SOLD_PRODUCTS_CACHE_TTL_SECONDS = 60
+_top_sold_products_cache = TTLCache(maxsize=1, ttl=TOP_SOLD_PRODUCTS_CACHE_TTL_SECONDS)
+_top_sold_products_lock = asyncio.Lock()
 
-# Configure the Gemini API client
-genai.configure(api_key=GEMINI_API_KEY)
+# --- Gemini API Configuration ---
+# The API key for Gemini is read from the environment (or .env) in the startup hook,
+# where the Gemini API client is configured. For this Canvas environment, leaving it
+# empty allows the system to inject it. The models below only use the client once a
+# request is made, so they can be created at import time.
 llm_model = genai.GenerativeModel('gemini-2.0-flash') # Using gemini-2.0-flash for efficiency
 
+# System instruction for the chat model. It is sent once per chat session
+# instead of being re-sent inside the prompt on every turn.
+SYSTEM_INSTRUCTION = """
+You are an e-commerce customer support chatbot named 'ShopAssist'. Your primary goal is to provide helpful and accurate information to users about products, orders, and inventory from our e-commerce database.
+
+You have access to the following data through internal 'tools' (database queries):
+- `top_sold_products`: To get a list of the top 5 most sold products. No parameters needed.
+- `order_status` (requires 'order_id'): To check the status of a specific order.
+- `product_stock` (requires 'product_name'): To find out how many units of a specific product are in stock.
+- `product_details` (requires 'product_name'): To get general information about a specific product (category, brand, price, department, SKU).
+
+Your response strategy:
+1.  **Identify User Intent and Parameters:** Based on the user's message, determine if they are asking for a specific piece of information that can be retrieved from the database. Extract any necessary parameters (like product name or order ID).
+2.  **Request Clarification:** If you detect an intent to query data but lack a crucial parameter (e.g., "What's the order status?" without an order ID), respond naturally by asking the user for the missing information.
+3.  **Formulate Database Query (JSON Output):** If you can identify a clear intent and have all required parameters for a database query, you must respond with a **JSON object** indicating the `query_type` and its `parameters`.
+    Also include an `answer_template`: a friendly, concise answer for the user with `{placeholders}` for the values the query returns. Only use these placeholder names:
+    - `order_status`: order_id, status, created_at, shipped_at, delivered_at
+    - `product_stock`: product_name, stock
+    - `product_details`: name, category, brand, retail_price, department, sku
+    Leave out `answer_template` for `top_sold_products`.
+    * Example for "What are the top 5 most sold products?":
+        ```json
+        {"intent": "query_data", "query_type": "top_sold_products", "parameters": {}}
+        ```
+    * Example for "What is the status of order 12345?":
+        ```json
+        {"intent": "query_data", "query_type": "order_status", "parameters": {"order_id": "12345"}, "answer_template": "Order {order_id} is currently in {status} status. It was created on {created_at}."}
+        ```
+    * Example for "How many Classic T-Shirts are left in stock?":
+        ```json
+        {"intent": "query_data", "query_type": "product_stock", "parameters": {"product_name": "Classic T-Shirt"}, "answer_template": "There are {stock} units of {product_name} left in stock."}
+        ```
+    * Example for "Tell me about the Super comfortable jeans":
+        ```json
+        {"intent": "query_data", "query_type": "product_details", "parameters": {"product_name": "Super comfortable jeans"}, "answer_template": "The {name} is a {brand} product in the {category} category, priced at ${retail_price}."}
+        ```
+4.  **Natural Language Response:** For general conversational questions (e.g., "Hello", "How are you?"), or if you've performed a database query, synthesize the information you've gathered into a helpful, concise, and friendly natural language response. Do NOT include technical details of the query in the user-facing response.
+5.  **Maintain Context:** Use the conversation history to understand follow-up questions.
+
+Always try to be helpful and direct. If you cannot fulfill a request, explain why politely.
+
+Your final response should be ONLY a JSON object if it's a tool call (query_data or clarify), otherwise, if it's a general conversation, the JSON should specify "general_chat" and the "response".
+"""
+
+chat_model = genai.GenerativeModel('gemini-2.0-flash', system_instruction=SYSTEM_INSTRUCTION)
+
+# --- JSON Responses ---
+# Datetimes read from MongoDB are naive UTC. OPT_NAIVE_UTC | OPT_UTC_Z writes them with a
+# trailing "Z", so clients (e.g. `new Date(...)` in the frontend) don't read them as local time.
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+def orjson_default(obj):
+    """
+    Serializes the few non-native types orjson may meet. orjson only calls this for
+    values it can't encode itself; ObjectIds are normally converted to strings where
+    documents are read, so responses stay on orjson's native path.
+    """
+    if type(obj) is ObjectId:
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps_json(content) -> bytes:
+    """
+    Serializes a response payload with orjson and the options above.
+    """
+    return orjson.dumps(content, default=orjson_default, option=ORJSON_OPTIONS)
+
+class JSONResponseUTC(ORJSONResponse):
+    """
+    ORJSONResponse that renders with dumps_json.
+    """
+    def render(self, content) -> bytes:
+        return dumps_json(content)
+
 # --- FastAPI App Initialization ---
 app = FastAPI(
     title="E-commerce Chatbot Backend",
     description="Backend service for conversational AI agent for an e-commerce site.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=JSONResponseUTC # Serialize every response with orjson
 )
 
 # --- CORS Configuration (NEW ADDITION FOR MILESTONE 9) ---
@@ -69,41 +181,113 @@ app.add_middleware(
     allow_headers=["*"],            # Allow all headers in the request
 )
 
-# --- Pydantic Models for Data Validation ---
+# --- Conversation Indexes ---
+# Indexes for the conversation queries, as (keys, options) pairs:
+# - (user_id, session_id): the chat handler's session lookup and upsert; unique, so the
+#   same session can't be created twice.
+# - session_id: the single-session endpoint; session IDs are UUIDs, so it is unique too.
+# - (user_id, created_at desc): the conversation list, which is sorted by created_at,
+#   so MongoDB can return it in index order instead of sorting in memory.
+CONVERSATION_INDEXES = [
+    ([("user_id", 1), ("session_id", 1)], {"unique": True}),
+    ([("session_id", 1)], {"unique": True}),
+    ([("user_id", 1), ("created_at", -1)], {}),
+]
+
+async def ensure_index(collection, keys, options):
+    """
+    Creates one index, logging (rather than raising) any failure.
+    create_index is a no-op when an identical index already exists, so this is cheap on every startup.
+    """
+    try:
+        index_name = await collection.create_index(keys, **options)
+        logger.info("Ensured index '%s' on '%s'.", index_name, collection.name)
+    except Exception as e:
+        logger.warning("Could not create index %s on '%s': %s", keys, collection.name, e)
+
+async def ensure_conversation_indexes(database):
+    """
+    Creates the indexes listed in CONVERSATION_INDEXES, concurrently.
+    """
+    await asyncio.gather(*(ensure_index(database.conversations, keys, options) for keys, options in CONVERSATION_INDEXES))
+
+# --- Startup/Shutdown Events ---
+@app.on_event("startup")
+async def connect_to_mongodb():
+    """
+    Runs once per worker process when the server starts: loads environment variables,
+    starts the log writer thread, configures the Gemini API client, creates the MongoDB client on the server's event
+    loop, tests the connection, makes the database available and ensures the conversation indexes.
+    Keeping this out of module import lets workers boot without waiting on the network.
+    """
+    global client, db
+
+    # Load environment variables from .env file (if it exists)
+    load_dotenv()
+    _log_listener.start()
+    log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+    try:
+        logger.setLevel(log_level)
+    except ValueError:
+        # A mistyped LOG_LEVEL shouldn't stop the server from starting
+        logger.setLevel(logging.INFO)
+        logger.warning("Unknown LOG_LEVEL '%s'; using INFO.", log_level)
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY", ""))
+
+    client = AsyncIOMotorClient(
+        MONGO_URI,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        retryWrites=True
+    )
+    database = client[DB_NAME]
+    try:
+        # The connection test and the index creations don't depend on each other, so they
+        # run concurrently and startup waits for the slowest one instead of their sum.
+        # Index failures are only logged; a failed ping leaves `db` unset.
+        await asyncio.gather(
+            client.admin.command('ping'), # Test connection
+            ensure_conversation_indexes(database)
+        )
+        db = database
+        logger.info("Successfully connected to MongoDB!")
+    except Exception as e:
+        logger.error("Could not connect to MongoDB. Please ensure MongoDB server is running on %s: %s", MONGO_URI, e)
+        # In a real application, you might exit here or implement a retry mechanism.
+
+@app.on_event("shutdown")
+async def close_mongodb_connection():
+    """
+    Closes the MongoDB client (and its connection pool) when the server stops,
+    then flushes and stops the log writer thread.
+    """
+    if client is not None:
+        client.close()
+    _log_listener.stop()
 
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
-    @classmethod
-    def __modify_schema__(cls, field_schema: dict):
-        field_schema.update(type="string")
+# --- Pydantic Models for Data Validation ---
 
 class Message(BaseModel):
     role: str = Field(..., description="Role of the sender (e.g., 'user', 'assistant')")
     content: str = Field(..., description="The textual content of the message")
-    timestamp: datetime = Field(default_factory=datetime.utcnow, description="UTC timestamp of when the message was created")
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="UTC timestamp of when the message was created")
 
 class Conversation(BaseModel):
-    id: Optional[PyObjectId] = Field(alias="_id", default=None, description="Unique MongoDB document ID for the conversation session")
+    # The MongoDB ObjectId is converted to a string when the document is read, so it is opaque here
+    id: Optional[str] = Field(alias="_id", default=None, description="Unique MongoDB document ID for the conversation session")
     user_id: str = Field(..., description="Identifier for the user")
-    session_id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="Unique UUID for this specific conversation session")
-    created_at: datetime = Field(default_factory=datetime.utcnow, description="UTC timestamp when this conversation session was created")
+    session_id: str = Field(default_factory=lambda: uuid.uuid4().hex, description="Unique UUID for this specific conversation session (32 hex digits, no hyphens; older sessions may use the hyphenated form)")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="UTC timestamp when this conversation session was created")
     messages: List[Message] = Field(default_factory=list, description="Ordered list of messages in this conversation session")
 
     class Config:
         allow_population_by_field_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
         schema_extra = {
             "example": {
                 "user_id": "test_user_456",
-                "session_id": "b8a9c0d1-e2f3-4567-890a-bcdef0123456",
+                "session_id": "b8a9c0d1e2f34567890abcdef0123456",
                 "created_at": "2025-07-26T11:00:00.000Z",
                 "messages": [
                     {"role": "user", "content": "Hi there!", "timestamp": "2025-07-26T11:00:10.000Z"},
@@ -112,6 +296,12 @@ class Conversation(BaseModel):
             }
         }
 
+class ConversationSummary(BaseModel):
+    user_id: str = Field(..., description="Identifier for the user")
+    session_id: str = Field(..., description="Unique UUID for this specific conversation session")
+    created_at: datetime = Field(..., description="UTC timestamp when this conversation session was created")
+    messages: List[Message] = Field(default_factory=list, description="The first message of the session, as a preview (empty for a session without messages)")
+
 class ChatRequest(BaseModel):
     user_id: str = Field(..., description="The ID of the user sending the message")
     message: str = Field(..., description="The user's message text")
@@ -122,50 +312,253 @@ class ChatResponse(BaseModel):
     assistant_response: str = Field(..., description="The AI's response to the user's message")
     conversation_history: List[Message] = Field(..., description="The full updated conversation history for the session")
 
-# --- Helper function to query the database ---
-def query_database(query_type: str, **kwargs):
+# --- LLM Chat Session Cache ---
+# One Gemini ChatSession per conversation, keyed by session_id (together with the
+# owning user_id), so each turn only sends the new user message and a known session
+# doesn't have to be read back from MongoDB. Least recently used sessions are evicted
+# past the limit; an evicted (or never seen) session is rebuilt from the stored history.
+# Each entry is [user_id, chat_session, stored_message_count]. The cache is per worker
+# process, so with several workers a session's turns may be saved by another worker;
+# sync_chat_session compares the stored message count after each save and rebuilds
+# the session when it doesn't match.
+MAX_CACHED_CHAT_SESSIONS = 1000
+_chat_sessions = OrderedDict()
+
+# Only the most recent messages of a conversation are kept in the LLM context,
+# so the prompt size per turn stays bounded on long sessions.
+# Keep this even: messages come in user/assistant pairs, so the window starts with a user turn.
+MAX_LLM_HISTORY_MESSAGES = 20
+
+def get_cached_chat_session(user_id: str, session_id: str):
+    """
+    Returns the cached Gemini ChatSession for a user's conversation, or None if it isn't cached.
+    The session's history is limited to the last MAX_LLM_HISTORY_MESSAGES messages.
+    """
+    cached = _chat_sessions.get(session_id)
+    if cached is None or cached[0] != user_id:
+        return None
+    _chat_sessions.move_to_end(session_id)
+    chat_session = cached[1]
+    if len(chat_session.history) > MAX_LLM_HISTORY_MESSAGES:
+        chat_session.history = chat_session.history[-MAX_LLM_HISTORY_MESSAGES:]
+    return chat_session
+
+def start_chat_session(user_id: str, session_id: str, messages: List[dict]):
+    """
+    Starts a Gemini ChatSession for a user's conversation, seeded with the last
+    MAX_LLM_HISTORY_MESSAGES of the given message history, and caches it.
+    """
+    history = [
+        {"role": "model" if msg["role"] == "assistant" else "user", "parts": [msg["content"]]}
+        for msg in messages[-MAX_LLM_HISTORY_MESSAGES:]
+    ]
+    chat_session = chat_model.start_chat(history=history)
+    _chat_sessions[session_id] = [user_id, chat_session, len(messages)]
+    if len(_chat_sessions) > MAX_CACHED_CHAT_SESSIONS:
+        _chat_sessions.popitem(last=False)
+    return chat_session
+
+def sync_chat_session(user_id: str, session_id: str, stored_messages: List[dict]):
+    """
+    Checks a cached session against its stored history after this process saved a turn
+    (two messages). If the stored count isn't the cached count plus two, other workers
+    saved turns this process hasn't seen, so the session is rebuilt from the stored
+    messages; the next turn then has the full context.
+    """
+    cached = _chat_sessions.get(session_id)
+    if cached is None or cached[0] != user_id:
+        return
+    if len(stored_messages) != cached[2] + 2:
+        logger.info("Chat session %s changed in another worker; rebuilding it from the stored history.", session_id)
+        start_chat_session(user_id, session_id, stored_messages)
+    else:
+        cached[2] = len(stored_messages)
+
+def record_chat_turn(session_id: str, chat_session, history_length: int, user_content: str, assistant_content: str):
+    """
+    Records a saved turn in the chat session's history as the user's message and the
+    reply the user actually saw, dropping whatever send_message_async stored for it
+    (the model's raw JSON intent, or nothing if the call failed). This keeps a cached
+    session's history identical to one rebuilt from MongoDB, so follow-up questions can
+    refer to the answered data. `history_length` is the history length before the turn was sent.
+    If the history grew by anything other than this turn (another request on the same
+    session ran concurrently in this process), the session is evicted instead, so the
+    next turn rebuilds it from the stored history.
+    """
+    cached = _chat_sessions.get(session_id)
+    if cached is None or cached[1] is not chat_session:
+        return
+    if len(chat_session.history) not in (history_length, history_length + 2):
+        logger.info("Chat session %s had concurrent turns; evicting it from the cache.", session_id)
+        _chat_sessions.pop(session_id, None)
+        return
+    chat_session.history = list(chat_session.history[:history_length]) + [
+        {"role": "user", "parts": [user_content]},
+        {"role": "model", "parts": [assistant_content]},
+    ]
+
+# --- Answer Templates ---
+class AnswerTemplateFormatter(string.Formatter):
+    """
+    Formats the LLM's answer template with a database result. Only plain field
+    names are allowed (no attribute/index lookups) and format specs are ignored,
+    since the template text comes from the model. Floats (e.g. prices, which are
+    stored with float noise) are written with 2 decimals. A field without a value
+    (null, e.g. `shipped_at` of an unshipped order) counts as a template miss.
+    """
+    def get_field(self, field_name, args, kwargs):
+        value = kwargs[field_name]
+        if value is None or value != value: # None or NaN
+            raise KeyError(field_name)
+        return value, field_name
+
+    def format_field(self, value, format_spec):
+        if isinstance(value, float):
+            return f"{value:.2f}"
+        return str(value)
+
+answer_template_formatter = AnswerTemplateFormatter()
+
+def render_answer_template(answer_template: Optional[str], db_result: dict) -> Optional[str]:
+    """
+    Fills the answer template returned with the query intent using the database
+    result. Returns None if there is no template, it doesn't match the result or it
+    refers to a field without a value; the caller then falls back to the synthesis prompt.
+    """
+    if not isinstance(answer_template, str) or not answer_template:
+        return None
+    try:
+        return answer_template_formatter.format(answer_template, **db_result)
+    except (KeyError, IndexError, ValueError):
+        return None
+
+# --- Helper functions to query the database ---
+# Projections limit the fields returned by MongoDB to those the chatbot reads.
+PRODUCT_PROJECTION = {"_id": 0, "id": 1, "name": 1, "category": 1, "brand": 1, "retail_price": 1, "department": 1, "sku": 1}
+ORDER_PROJECTION = {"_id": 0, "order_id": 1, "status": 1, "created_at": 1, "shipped_at": 1, "delivered_at": 1}
+
+async def find_product(product_name: str):
+    """
+    Looks up a product by name. An exact, case-insensitive match on the indexed
+    'name_lower' field is tried first, then a prefix match on the same index;
+    otherwise the best match from the text index on 'name' is returned.
+    The prefix is sent as an anchored regex string with no options: MongoDB only turns
+    such a regex into a bounded index range. (A compiled Python pattern would be sent
+    with the 'u' flag, which makes MongoDB scan the whole index.) The name is escaped
+    so regex characters in user input match literally.
+    Both indexes are created by load_data.py.
+    """
+    name_lower = product_name.lower()
+    product = await db.products.find_one({"name_lower": name_lower}, PRODUCT_PROJECTION)
+    if product:
+        return product
+    product = await db.products.find_one(
+        {"name_lower": {"$regex": "^" + re.escape(name_lower)}},
+        PRODUCT_PROJECTION,
+        sort=[("name_lower", 1)]
+    )
+    if product:
+        return product
+    return await db.products.find_one(
+        {"$text": {"$search": product_name}},
+        {**PRODUCT_PROJECTION, "score": {"$meta": "textScore"}},
+        sort=[("score", {"$meta": "textScore"})]
+    )
+
+# Unsold inventory items are stored with a null 'sold_at'. This is also the filter of the
+# partial inventory_items index created by load_data.py, so a stock count only reads the
+# product's entries in that index (which leaves out sold items, but is not small: most
+# items are unsold). Queries must use the filter as-is for MongoDB to pick the partial index.
+UNSOLD_INVENTORY_FILTER = {"sold_at": {"$type": "null"}}
+
+async def find_product_stock(product_name: str):
+    """
+    Looks up a product by name and counts its unsold inventory items.
+    For an exact name match, the product lookup and the count run in a single
+    aggregation ($lookup into inventory_items), so one round trip answers the question.
+    Otherwise the product is found through find_product's fallbacks (its exact-match
+    step repeats as a cheap indexed miss) and counted separately.
+    Returns {"name", "stock"}, or None if no product matches.
+    """
+    products = await db.products.aggregate([
+        {"$match": {"name_lower": product_name.lower()}},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": "inventory_items",
+            "localField": "id",
+            "foreignField": "product_id",
+            "pipeline": [{"$match": UNSOLD_INVENTORY_FILTER}, {"$count": "count"}],
+            "as": "stock"
+        }},
+        {"$project": {"_id": 0, "name": 1, "stock": {"$ifNull": [{"$first": "$stock.count"}, 0]}}}
+    ]).to_list(length=1)
+    if products:
+        return products[0]
+
+    product = await find_product(product_name)
+    if not product:
+        return None
+    available_stock = await db.inventory_items.count_documents({"product_id": product["id"], **UNSOLD_INVENTORY_FILTER})
+    return {"name": product["name"], "stock": available_stock}
+
+async def query_database(query_type: str, **kwargs):
     """
     Queries the e-commerce MongoDB database based on the intent and parameters
     identified by the LLM.
     """
     if db is None:
-        print("ERROR: Database connection not available for query_database.")
+        logger.error("Database connection not available for query_database.")
         return {"error": "Database not connected."}
 
-    print(f"DEBUG: Executing database query type: {query_type} with params: {kwargs}")
+    logger.debug("Executing database query type: %s with params: %s", query_type, kwargs)
 
     if query_type == "top_sold_products":
-        try:
-            pipeline = [
-                {"$group": {"_id": "$product_id", "sold_count": {"$sum": 1}}},
-                {"$sort": {"sold_count": -1}},
-                {"$limit": 5},
-                {"$lookup": {
-                    "from": "products",
-                    "localField": "_id",
-                    "foreignField": "id",
-                    "as": "product_info"
-                }},
-                {"$unwind": "$product_info"},
-                {"$project": {"_id": 0, "product_name": "$product_info.name", "sold_count": 1, "category": "$product_info.category"}}
-            ]
-            top_products = list(db.order_items.aggregate(pipeline))
-            if top_products:
-                return {"products": top_products}
-            else:
-                return {"products": []}
-        except Exception as e:
-            print(f"Error querying top sold products: {e}")
-            return {"error": "Failed to retrieve top sold products."}
+        result = _top_sold_products_cache.get("top_sold_products")
+        if result is not None:
+            return result
+        async with _top_sold_products_lock:
+            # Another request may have refreshed the cache while this one waited for the lock
+            result = _top_sold_products_cache.get("top_sold_products")
+            if result is not None:
+                return result
+            try:
+                top_products = await db[TOP_SOLD_PRODUCTS_COLLECTION].find({}, {"_id": 0}).sort("sold_count", -1).to_list(length=None)
+                if not top_products:
+                    # The materialized collection is missing (load_data.py hasn't been re-run),
+                    # so fall back to aggregating over order_items directly.
+                    pipeline = [
+                        {"$group": {"_id": "$product_id", "sold_count": {"$sum": 1}}},
+                        {"$sort": {"sold_count": -1}},
+                        {"$limit": 5},
+                        {"$lookup": {
+                            "from": "products",
+                            "localField": "_id",
+                            "foreignField": "id",
+                            "as": "product_info"
+                        }},
+                        {"$unwind": "$product_info"},
+                        {"$project": {"_id": 0, "product_name": "$product_info.name", "sold_count": 1, "category": "$product_info.category"}}
+                    ]
+                    top_products = await db.order_items.aggregate(pipeline).to_list(length=None)
+                result = {"products": top_products}
+                _top_sold_products_cache["top_sold_products"] = result
+                return result
+            except Exception as e:
+                logger.error("Error querying top sold products: %s", e)
+                return {"error": "Failed to retrieve top sold products."}
 
     elif query_type == "order_status":
         order_id_str = kwargs.get("order_id")
         if not order_id_str:
             return {"error": "Order ID is required."}
         try:
-            order = db.orders.find_one({"order_id": order_id_str})
-            if not order:
-                order = db.orders.find_one({"order_id": int(order_id_str)})
+            # order_id may be stored as a string or a number; match either in one query
+            candidates = [order_id_str]
+            try:
+                candidates.append(int(order_id_str))
+            except (ValueError, TypeError):
+                pass
+            order = await db.orders.find_one({"order_id": {"$in": candidates}}, ORDER_PROJECTION)
 
             if order:
                 return {
@@ -177,10 +570,8 @@ def query_database(query_type: str, **kwargs):
                 }
             else:
                 return {"error": "Order not found."}
-        except (ValueError, TypeError):
-            return {"error": "Invalid order ID format. Please provide a numeric ID."}
         except Exception as e:
-            print(f"Error querying order status: {e}")
+            logger.error("Error querying order status: %s", e)
             return {"error": "Failed to retrieve order status."}
 
     elif query_type == "product_stock":
@@ -188,18 +579,13 @@ def query_database(query_type: str, **kwargs):
         if not product_name:
             return {"error": "Product name is required."}
         try:
-            product = db.products.find_one({"name": {"$regex": product_name, "$options": "i"}})
-            if product:
-                product_id = product["id"]
-                available_stock = db.inventory_items.count_documents({
-                    "product_id": product_id,
-                    "sold_at": {"$exists": False}
-                })
-                return {"product_name": product["name"], "stock": available_stock}
+            product_stock = await find_product_stock(product_name)
+            if product_stock:
+                return {"product_name": product_stock["name"], "stock": product_stock["stock"]}
             else:
                 return {"error": "Product not found."}
         except Exception as e:
-            print(f"Error querying product stock: {e}")
+            logger.error("Error querying product stock: %s", e)
             return {"error": "Failed to retrieve product stock."}
 
     elif query_type == "product_details":
@@ -207,7 +593,7 @@ def query_database(query_type: str, **kwargs):
         if not product_name:
             return {"error": "Product name is required."}
         try:
-            product = db.products.find_one({"name": {"$regex": product_name, "$options": "i"}})
+            product = await find_product(product_name)
             if product:
                 return {
                     "name": product.get("name"),
@@ -220,7 +606,7 @@ def query_database(query_type: str, **kwargs):
             else:
                 return {"error": "Product not found."}
         except Exception as e:
-            print(f"Error querying product details: {e}")
+            logger.error("Error querying product details: %s", e)
             return {"error": "Failed to retrieve product details."}
 
     return {"error": "Unknown query type or insufficient parameters."}
@@ -235,7 +621,46 @@ async def root():
     """
     return {"message": "E-commerce Chatbot Backend is running!"}
 
-@app.post("/api/chat", response_model=ChatResponse, status_code=status.HTTP_200_OK)
+@app.get("/api/health")
+async def health():
+    """
+    Reports whether MongoDB is reachable, together with the connection pool settings
+    and the state of each known MongoDB server as seen by the driver.
+    """
+    if client is None:
+        return JSONResponseUTC({"status": "starting", "database": False}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    try:
+        await client.admin.command('ping')
+        database_ok = db is not None
+    except Exception as e:
+        logger.warning("Health check could not reach MongoDB: %s", e)
+        database_ok = False
+
+    topology = client.topology_description
+    pool_options = client.options.pool_options
+    return JSONResponseUTC(
+        {
+            "status": "ok" if database_ok else "degraded",
+            "database": database_ok,
+            "pool": {
+                "max_pool_size": pool_options.max_pool_size,
+                "min_pool_size": pool_options.min_pool_size,
+            },
+            "topology_type": topology.topology_type_name,
+            "servers": [
+                {
+                    "address": f"{host}:{port}",
+                    "type": server.server_type_name,
+                    "round_trip_time_ms": None if server.round_trip_time is None else round(server.round_trip_time * 1000, 2),
+                }
+                for (host, port), server in topology.server_descriptions().items()
+            ],
+        },
+        status_code=status.HTTP_200_OK if database_ok else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+@app.post("/api/chat", responses={status.HTTP_200_OK: {"model": ChatResponse}}, status_code=status.HTTP_200_OK)
 async def chat_with_bot(request: ChatRequest):
     """
     Handles a user's chat message, manages conversation history,
@@ -251,122 +676,79 @@ async def chat_with_bot(request: ChatRequest):
 
     conversations_collection = db.conversations
 
-    # 1. Find or create a conversation session
-    conversation_doc = None
-    if session_id:
-        conversation_doc = conversations_collection.find_one({"user_id": user_id, "session_id": session_id})
-        if not conversation_doc:
-            print(f"INFO: Provided session_id '{session_id}' not found for user '{user_id}'. Starting a new session.")
-            session_id = str(uuid.uuid4())
-            new_conversation = Conversation(user_id=user_id, session_id=session_id)
-            conversation_doc = new_conversation.dict(by_alias=True, exclude_none=True)
-            conversations_collection.insert_one(conversation_doc)
-            print(f"INFO: Created new conversation session: {session_id}")
-    else:
-        session_id = str(uuid.uuid4())
-        new_conversation = Conversation(user_id=user_id, session_id=session_id)
-        conversation_doc = new_conversation.dict(by_alias=True, exclude_none=True)
-        conversations_collection.insert_one(conversation_doc)
-        print(f"INFO: Created new conversation session: {session_id}")
-
-    conversation = Conversation(**conversation_doc)
-
-    # Add the user's message to the conversation history
-    user_message = Message(role="user", content=user_message_content)
-    conversation.messages.append(user_message)
-    print(f"DEBUG: User message added to session {session_id}.")
+    # 1. Resume the conversation session, or start a new one.
+    # A session whose LLM chat is cached in this process needs no database read.
+    # Otherwise its stored history is read once to seed the chat. A new session is
+    # not inserted here; the upsert that saves its first messages creates it.
+    chat_session = get_cached_chat_session(user_id, session_id) if session_id else None
+    if chat_session is None:
+        messages = []
+        if session_id:
+            conversation_doc = await conversations_collection.find_one(
+                {"user_id": user_id, "session_id": session_id},
+                {"_id": 0, "messages": 1}
+            )
+            if conversation_doc:
+                messages = conversation_doc.get("messages", [])
+            else:
+                logger.info("Provided session_id '%s' not found for user '%s'. Starting a new session.", session_id, user_id)
+                session_id = None
+        if not session_id:
+            # The 32-character hex form keeps the (user_id, session_id) index keys 4 bytes
+            # shorter than the hyphenated form; session IDs are opaque strings either way.
+            session_id = uuid.uuid4().hex
+            logger.info("Started new conversation session: %s", session_id)
+        chat_session = start_chat_session(user_id, session_id, messages)
+
+    # Create the user's message; it is saved together with the assistant's reply below.
+    # Messages are built as plain dicts in the stored shape; there is no need for a
+    # Pydantic model round trip for data we create ourselves.
+    user_message = {"role": "user", "content": user_message_content, "timestamp": datetime.now(timezone.utc)}
+    logger.debug("User message created for session %s.", session_id)
 
     assistant_response_content = "I'm sorry, I couldn't process your request at this moment."
+    history_length = len(chat_session.history)
 
     try:
-        system_instruction_content = """
-        You are an e-commerce customer support chatbot named 'ShopAssist'. Your primary goal is to provide helpful and accurate information to users about products, orders, and inventory from our e-commerce database.
-
-        You have access to the following data through internal 'tools' (database queries):
-        - `top_sold_products`: To get a list of the top 5 most sold products. No parameters needed.
-        - `order_status` (requires 'order_id'): To check the status of a specific order.
-        - `product_stock` (requires 'product_name'): To find out how many units of a specific product are in stock.
-        - `product_details` (requires 'product_name'): To get general information about a specific product (category, brand, price, department, SKU).
-
-        Your response strategy:
-        1.  **Identify User Intent and Parameters:** Based on the user's message, determine if they are asking for a specific piece of information that can be retrieved from the database. Extract any necessary parameters (like product name or order ID).
-        2.  **Request Clarification:** If you detect an intent to query data but lack a crucial parameter (e.g., "What's the order status?" without an order ID), respond naturally by asking the user for the missing information.
-        3.  **Formulate Database Query (JSON Output):** If you can identify a clear intent and have all required parameters for a database query, you must respond with a **JSON object** indicating the `query_type` and its `parameters`.
-            * Example for "What are the top 5 most sold products?":
-                ```json
-                {"intent": "query_data", "query_type": "top_sold_products", "parameters": {}}
-                ```
-            * Example for "What is the status of order 12345?":
-                ```json
-                {"intent": "query_data", "query_type": "order_status", "parameters": {"order_id": "12345"}}
-                ```
-            * Example for "How many Classic T-Shirts are left in stock?":
-                ```json
-                {"intent": "query_data", "query_type": "product_stock", "parameters": {"product_name": "Classic T-Shirt"}}
-                ```
-            * Example for "Tell me about the Super comfortable jeans":
-                ```json
-                {"intent": "query_data", "query_type": "product_details", "parameters": {"product_name": "Super comfortable jeans"}}
-                ```
-        4.  **Natural Language Response:** For general conversational questions (e.g., "Hello", "How are you?"), or if you've performed a database query, synthesize the information you've gathered into a helpful, concise, and friendly natural language response. Do NOT include technical details of the query in the user-facing response.
-        5.  **Maintain Context:** Use the conversation history to understand follow-up questions.
-
-        Always try to be helpful and direct. If you cannot fulfill a request, explain why politely.
-        """
-
-        # Prepare chat history for the LLM
-        llm_input_messages = [
-            {"role": "user", "parts": [{"text": system_instruction_content}]}
-        ]
-        for msg in conversation.messages:
-            llm_input_messages.append({"role": msg.role, "parts": [{"text": msg.content}]})
-
-        # The prompt for structured intent recognition and response generation
-        combined_prompt = f"""
-        {system_instruction_content}
-
-        Based on the conversation history below and the user's latest message, generate the appropriate response.
-
-        Conversation History (User and Assistant messages):
-        {json.dumps([{"role": msg.role, "content": msg.content} for msg in conversation.messages], indent=2)}
-
-        User's latest message: "{user_message_content}"
-
-        Your final response should be ONLY a JSON object if it's a tool call (query_data or clarify), otherwise, if it's a general conversation, the JSON should specify "general_chat" and the "response".
-        """
-
-        print(f"DEBUG: Sending combined prompt to LLM for intent/response:\n{combined_prompt}")
-
-        llm_response_raw = llm_model.generate_content(
-            combined_prompt,
+        # Send only the new message; the chat session already holds the system
+        # instruction and the earlier turns of this conversation.
+        logger.debug("Sending user message to LLM chat session %s: %s", session_id, user_message_content)
+
+        llm_response_raw = await chat_session.send_message_async(
+            user_message_content,
             generation_config={
                 "response_mime_type": "application/json"
             }
         )
         llm_output_text = llm_response_raw.text
-        print(f"DEBUG: LLM raw response: {llm_output_text}")
+        logger.debug("LLM raw response: %s", llm_output_text)
 
         llm_data = {}
         try:
-            llm_data = json.loads(llm_output_text)
-            print(f"DEBUG: Parsed LLM structured data: {llm_data}")
-        except json.JSONDecodeError:
-            print(f"WARNING: LLM did not return valid JSON. Falling back to simple general chat response.")
+            llm_data = orjson.loads(llm_output_text)
+            logger.debug("Parsed LLM structured data: %s", llm_data)
+        except orjson.JSONDecodeError:
+            logger.warning("LLM did not return valid JSON. Falling back to simple general chat response.")
             llm_data = {"intent": "general_chat", "response": "I'm having a bit of trouble understanding your request. Could you please rephrase it?"}
 
         intent = llm_data.get("intent")
         query_type = llm_data.get("query_type")
         parameters = llm_data.get("parameters", {})
+        answer_template = llm_data.get("answer_template")
 
         if intent == "query_data":
-            db_result = query_database(query_type, **parameters)
+            db_result = await query_database(query_type, **parameters)
             if "error" in db_result:
                 assistant_response_content = f"I encountered an issue retrieving that information: {db_result['error']}"
+            elif (templated_response := render_answer_template(answer_template, db_result)) is not None:
+                # The intent call already provided the wording, so no second LLM call is needed
+                assistant_response_content = templated_response
+                logger.debug("Filled answer template for '%s' without a synthesis call.", query_type)
             else:
                 synthesis_prompt = f"""
                 The user asked about '{query_type}'.
                 Here is the data retrieved from the database:
-                {json.dumps(db_result, indent=2)}
+                {orjson.dumps(db_result, option=orjson.OPT_INDENT_2).decode()}
 
                 Based on this data, formulate a helpful, concise, and friendly answer for the user.
                 Do not include technical details of the query. If the data is insufficient to fully answer, state that politely.
@@ -377,8 +759,8 @@ async def chat_with_bot(request: ChatRequest):
                 - Product Stock: "There are {db_result.get('stock')} units of {db_result.get('product_name')} left in stock."
                 - Product Details: "The {db_result.get('name')} is a {db_result.get('brand')} brand product in the {db_result.get('category')} category, priced at ${db_result.get('retail_price')}."
                 """
-                print(f"DEBUG: Sending synthesis prompt to LLM:\n{synthesis_prompt}")
-                synthesis_response = llm_model.generate_content(synthesis_prompt)
+                logger.debug("Sending synthesis prompt to LLM:\n%s", synthesis_prompt)
+                synthesis_response = await llm_model.generate_content_async(synthesis_prompt)
                 assistant_response_content = synthesis_response.text
 
         elif intent == "clarify":
@@ -389,56 +771,125 @@ async def chat_with_bot(request: ChatRequest):
 
         else:
             assistant_response_content = "I'm still learning and couldn't process that request. Can you rephrase?"
-            print(f"WARNING: Unexpected intent received from LLM: {intent}. Full LLM data: {llm_data}")
+            logger.warning("Unexpected intent received from LLM: %s. Full LLM data: %s", intent, llm_data)
 
 
     except Exception as e:
-        print(f"ERROR: An error occurred during LLM interaction or intent processing: {e}")
+        logger.error("An error occurred during LLM interaction or intent processing: %s", e)
         assistant_response_content = "I apologize, an unexpected error occurred. Please try again later."
 
 
-    # Add assistant message to history
-    assistant_message = Message(role="assistant", content=assistant_response_content)
-    conversation.messages.append(assistant_message)
-    print(f"DEBUG: Assistant response generated for session {session_id}.")
+    # Create the assistant's message
+    assistant_message = {"role": "assistant", "content": assistant_response_content, "timestamp": datetime.now(timezone.utc)}
+    logger.debug("Assistant response generated for session %s.", session_id)
 
-    # Update the conversation document in MongoDB
+    # Append the two new messages to the conversation document in MongoDB, in one operation.
+    # $push sends only these messages instead of rewriting the whole history, the upsert
+    # creates the document (with its created_at) for a new session, and the updated
+    # message history is returned for the response.
+    save_filter = {"user_id": user_id, "session_id": session_id}
+    save_update = {
+        "$setOnInsert": {"created_at": datetime.now(timezone.utc)},
+        "$push": {"messages": {"$each": [user_message, assistant_message]}}
+    }
     try:
-        update_result = conversations_collection.update_one(
-            {"_id": conversation.id},
-            {"$set": {"messages": [msg.dict() for msg in conversation.messages]}}
-        )
-        if update_result.matched_count == 0:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation document not found for update after AI processing.")
-        print(f"INFO: Updated conversation session {session_id} for user {user_id} in MongoDB after AI response.")
+        try:
+            conversation_doc = await conversations_collection.find_one_and_update(
+                save_filter, save_update,
+                projection={"_id": 0, "messages": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Two concurrent upserts for the same new session can both try to insert;
+            # the unique (user_id, session_id) index rejects one. The document exists
+            # now, so retrying the same update appends to it.
+            conversation_doc = await conversations_collection.find_one_and_update(
+                save_filter, save_update,
+                projection={"_id": 0, "messages": 1},
+                return_document=ReturnDocument.AFTER
+            )
+        logger.info("Updated conversation session %s for user %s in MongoDB after AI response.", session_id, user_id)
     except Exception as e:
-        print(f"ERROR: Failed to update conversation in database after AI processing: {e}")
+        logger.error("Failed to update conversation in database after AI processing: %s", e)
+        # The chat session already holds this unsaved turn; drop it so the next turn
+        # is rebuilt from what MongoDB actually stored.
+        _chat_sessions.pop(session_id, None)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to save conversation history after AI response: {e}")
 
-    # Return the response to the frontend
-    return ChatResponse(
-        session_id=conversation.session_id,
-        assistant_response=assistant_response_content,
-        conversation_history=conversation.messages
-    )
+    # Only now that the turn is stored, record it in the cached chat session and check
+    # the session against the stored history.
+    record_chat_turn(session_id, chat_session, history_length, user_message_content, assistant_response_content)
+    sync_chat_session(user_id, session_id, conversation_doc["messages"])
 
-@app.get("/api/conversations/{user_id}", response_model=List[Conversation])
-async def get_user_conversations(user_id: str):
+    # Return the response to the frontend. The stored messages are already in the
+    # ChatResponse shape, so they are serialized directly without building models.
+    return JSONResponseUTC({
+        "session_id": session_id,
+        "assistant_response": assistant_response_content,
+        "conversation_history": conversation_doc["messages"]
+    })
+
+async def stream_json_array(first_doc, cursor):
     """
-    Retrieves all conversation sessions for a given user, sorted by creation date (most recent first).
+    Serializes `first_doc` followed by the remaining documents of a MongoDB cursor as a
+    JSON array, one document at a time, so a response never holds more than the current
+    batch of documents in memory. The caller fetches the first document (None if there is
+    none) before the response starts, so query and connection errors still get an error
+    status; a failure after that can only end the stream early, and is logged.
+    """
+    if first_doc is None:
+        yield b"[]"
+        return
+    yield b"[" + dumps_json(first_doc)
+    try:
+        async for doc in cursor:
+            yield b"," + dumps_json(doc)
+    except Exception as e:
+        logger.error("Failed to stream documents from MongoDB: %s", e)
+        raise
+    yield b"]"
+
+# The conversation endpoints return their MongoDB documents directly as a JSONResponseUTC.
+# With a response_model FastAPI would validate and re-encode every conversation and
+# message on the way out; the documents are already in the response shape, so the
+# models are only referenced for the API docs.
+@app.get("/api/conversations/{user_id}", responses={status.HTTP_200_OK: {"model": List[ConversationSummary]}})
+async def get_user_conversations(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of conversation sessions to return"),
+    skip: int = Query(0, ge=0, description="Number of conversation sessions to skip (for pagination)")
+):
+    """
+    Retrieves a page of conversation sessions for a given user, sorted by creation date (most recent first).
+    Each session is returned as a summary: only the fields needed to list it and its
+    first message as a preview. The full history is available from /api/conversation/{session_id}.
+    The JSON array is streamed as the documents arrive from MongoDB.
     """
     if db is None:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database not connected. Please check server logs.")
 
     conversations_collection = db.conversations
-    user_conversations_docs = list(conversations_collection.find({"user_id": user_id}).sort("created_at", -1))
+    user_conversations_cursor = conversations_collection.find(
+        {"user_id": user_id},
+        {"_id": 0, "user_id": 1, "session_id": 1, "created_at": 1, "messages": {"$slice": 1}}
+    ).sort("created_at", -1).skip(skip).limit(limit)
 
-    if not user_conversations_docs:
-        return []
+    # Run the query before the response headers are sent, by fetching the first document
+    try:
+        first_doc = await user_conversations_cursor.next()
+    except StopAsyncIteration:
+        first_doc = None
+    except ConnectionFailure as e:
+        logger.error("Could not reach MongoDB to list conversations for user %s: %s", user_id, e)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database not reachable. Please check server logs.")
+    except Exception as e:
+        logger.error("Failed to list conversations for user %s: %s", user_id, e)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to retrieve conversations: {e}")
 
-    return [Conversation(**doc) for doc in user_conversations_docs]
+    return StreamingResponse(stream_json_array(first_doc, user_conversations_cursor), media_type="application/json")
 
-@app.get("/api/conversation/{session_id}", response_model=Conversation)
+@app.get("/api/conversation/{session_id}", responses={status.HTTP_200_OK: {"model": Conversation}})
 async def get_conversation_by_session_id(session_id: str):
     """
     Retrieves a specific conversation session by its unique session ID.
@@ -447,9 +898,11 @@ async def get_conversation_by_session_id(session_id: str):
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database not connected. Please check server logs.")
 
     conversations_collection = db.conversations
-    conversation_doc = conversations_collection.find_one({"session_id": session_id})
+    conversation_doc = await conversations_collection.find_one({"session_id": session_id})
 
     if not conversation_doc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Conversation session '{session_id}' not found.")
 
-    return Conversation(**conversation_doc)
\ No newline at end of file
+    conversation_doc["_id"] = str(conversation_doc["_id"])
+
+    return JSONResponseUTC(conversation_doc)
\ No newline at end of file